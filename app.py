@@ -1,9 +1,14 @@
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 import random
 import pandas as pd
-import ast
+import re
 import time
+import queue
+import threading
 from pymongo import MongoClient
+from pymongo.server_api import ServerApi
+from pymongo.write_concern import WriteConcern
 from datetime import datetime
 
 # -----------------------------
@@ -11,12 +16,19 @@ from datetime import datetime
 # -----------------------------
 DEFAULT_USER_NAME = "Annotator_Guest"
 TIMER_DURATION_SECONDS = 20  # Minimum timer duration
+NEUTRAL_LABEL = "Don't know/Neutral"
 
 # --- Configuration for YOUR MongoDB setup ---
 # NOTE: Make sure these names match your MongoDB
 DB_NAME = "responses" 
 QUESTION_COLLECTION_NAME = "questions_collection" # This matches your upload
 RESPONSE_COLLECTION_NAME = "responses_collection"
+QUESTION_POOL_SIZE = 500  # Questions fetched per cache window
+QUESTION_POOL_TTL_SECONDS = 300  # Sessions in the same window share one fetch
+# Only the fields the app reads are sent back from the server
+QUESTION_PROJECTION = {"_id": 0, "id": 1, "sentence": 1, "true_label": 1, "others_options": 1}
+RESPONSE_BATCH_SIZE = 50  # Max responses per background insert_many
+RESPONSE_FLUSH_SECONDS = 1  # Max time a response waits in the write queue
 # ---------------------------------------------
 
 # -----------------------------
@@ -39,9 +51,28 @@ def init_db():
         return None
 
     try:
-        client = MongoClient(MONGO_URI)
+        client = MongoClient(
+            MONGO_URI,
+            server_api=ServerApi("1"),
+            maxPoolSize=50,
+            minPoolSize=5, # Keep warm connections so the first query skips the TLS handshake
+            serverSelectionTimeoutMS=5000,
+            compressors="zstd,zlib", # zlib is the fallback if zstandard isn't installed
+            retryWrites=True,
+            w=1
+        )
         client.admin.command('ping') # Test connection
         db = client[DB_NAME]
+        db[QUESTION_COLLECTION_NAME].find_one({}, QUESTION_PROJECTION) # Warm up the questions collection
+
+        questions_collection = db[QUESTION_COLLECTION_NAME]
+        questions_collection.create_index([("random_key", 1)])
+        questions_collection.create_index("id")
+
+        # Indexes for per-user / per-question queries on the responses
+        db[RESPONSE_COLLECTION_NAME].create_index(
+            [("user_name", 1), ("question_id", 1), ("timestamp", -1)]
+        )
         print("Successfully connected to MongoDB Atlas!")
         return db
     except Exception as e:
@@ -49,85 +80,138 @@ def init_db():
         st.stop()
         return None
 
-# Initialize the database connection
-db = init_db()
+def _response_writer_loop(response_queue, responses_collection):
+    """Drains the response queue, writing up to RESPONSE_BATCH_SIZE docs per insert_many."""
+    while True:
+        batch = [response_queue.get()]
+        deadline = time.time() + RESPONSE_FLUSH_SECONDS
+        while len(batch) < RESPONSE_BATCH_SIZE:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(response_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        try:
+            responses_collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            print(f"Error saving responses to MongoDB: {e}")
+
+@st.cache_resource
+def init_response_writer(_db):
+    """Starts the background thread that writes responses and returns its queue."""
+    response_queue = queue.Queue()
+    # Responses are cheap to lose on a crash, so don't wait for the journal
+    responses_collection = _db.get_collection(
+        RESPONSE_COLLECTION_NAME, write_concern=WriteConcern(w=1, j=False)
+    )
+    threading.Thread(
+        target=_response_writer_loop,
+        args=(response_queue, responses_collection),
+        daemon=True
+    ).start()
+    return response_queue
 
 # -----------------------------
 # Helper functions
 # -----------------------------
 
+# One option: runs between separators, trimmed of whitespace and quotes
+_OPTION_RE = re.compile(r"""[^{}\[\]'",\s](?:[^{}\[\],]*[^{}\[\]'",\s])?""")
+
 def clean_mongo_options(option_str):
     """
     Cleans the specific string format "{Female, LGBTQ}" 
     from your MongoDB data into a Python list.
     """
     if isinstance(option_str, str):
-        # Remove curly braces, brackets, and quotes
-        clean_str = option_str.strip().strip('{}[]')
-        # Split by comma and strip whitespace/quotes from each item
-        return [s.strip().strip("'\"") for s in clean_str.split(',')]
+        # Pull out each option in a single regex pass
+        return _OPTION_RE.findall(option_str)
     return []
 
-def get_random_questions(user_name, n=20):
+def question_from_doc(doc):
     """
-    Fetches n random questions from your 'questions_collection'.
+    Converts a projected question document into the tuple the UI uses:
+    (question_id, question_text, true_label, others_options_list)
     """
-    if db is None:
-        return []
+    # --- Use field names from your screenshot ---
+    question_id = doc.get('id') # '_id' is projected out
+    question_text = doc.get('sentence', 'N/A') # Use 'sentence'
+    true_label = doc.get('true_label', 'N/A')
+    
+    # Clean the specific string format e.g., "{Female, LGBTQ}"
+    others_options_list = clean_mongo_options(doc.get('others_options', ''))
+    # ----------------------------------------------
+
+    return (
+        question_id,
+        question_text,
+        true_label,
+        others_options_list
+    )
 
-    try:
-        questions_collection = db[QUESTION_COLLECTION_NAME]
+@st.cache_data(ttl=QUESTION_POOL_TTL_SECONDS)
+def _fetch_question_pool(time_bucket):
+    """
+    Fetches a pool of random questions from your 'questions_collection'.
+    Cached per time bucket, so all sessions in the same window share one round-trip.
+    """
+    db = init_db()
+    questions_collection = db[QUESTION_COLLECTION_NAME]
+
+    # Give every question a random_key so sampling is an index seek. Done on each
+    # fetch so questions uploaded while the app is running are picked up too.
+    questions_collection.update_many(
+        {"random_key": {"$exists": False}},
+        [{"$set": {"random_key": {"$rand": {}}}}]
+    )
 
-        pipeline = [
-            {"$sample": {"size": n}}
-        ]
-        results = list(questions_collection.aggregate(pipeline))
-
-        # The function must return a list of tuples:
-        # (question_id, question_text, true_label, others_options_str)
-        questions_list = []
-        for doc in results:
-            # --- Use field names from your screenshot ---
-            question_id = doc.get('id', str(doc['_id']))
-            question_text = doc.get('sentence', 'N/A') # Use 'sentence'
-            true_label = doc.get('true_label', 'N/A')
-            
-            # Clean the specific string format e.g., "{Female, LGBTQ}"
-            others_options_list = clean_mongo_options(doc.get('others_options', ''))
-            
-            # Convert list back to string for compatibility with original code's ast.literal_eval
-            others_options_str = str(others_options_list) 
-            # ----------------------------------------------
+    # Seek to a random point on the random_key index and read forward,
+    # wrapping around to the start if we run off the end.
+    # Documents are converted as the cursor streams them in.
+    r = random.random()
+    cursor = questions_collection.find(
+        {"random_key": {"$gte": r}}, QUESTION_PROJECTION, limit=QUESTION_POOL_SIZE
+    )
+    questions_list = [question_from_doc(doc) for doc in cursor]
+    if len(questions_list) < QUESTION_POOL_SIZE:
+        cursor = questions_collection.find(
+            {"random_key": {"$lt": r}}, QUESTION_PROJECTION, limit=QUESTION_POOL_SIZE - len(questions_list)
+        )
+        questions_list += [question_from_doc(doc) for doc in cursor]
 
-            questions_list.append((
-                question_id,
-                question_text,
-                true_label,
-                others_options_str
-            ))
+    return questions_list
 
-        return questions_list
+def get_random_questions(user_name, n=20):
+    """
+    Picks n random questions for a session from the cached question pool.
+    """
+    db = init_db()
+    if db is None:
+        return []
 
+    try:
+        pool = _fetch_question_pool(int(time.time() // QUESTION_POOL_TTL_SECONDS))
     except Exception as e:
         st.error(f"Error fetching questions from MongoDB: {e}")
         return []
 
+    return random.sample(pool, min(n, len(pool)))
+
 def save_response(user_name, question_id, response):
-    """Saves a single user response to the MongoDB responses_collection."""
+    """Queues a single user response for the background writer to save to MongoDB."""
+    db = init_db()
     if db is None:
         return
 
-    try:
-        responses_collection = db[RESPONSE_COLLECTION_NAME]
-        response_doc = {
-            "user_name": user_name,
-            "question_id": question_id,
-            "response": response,
-            "timestamp": datetime.now()
-        }
-        responses_collection.insert_one(response_doc)
-    except Exception as e:
-        print(f"Error saving response to MongoDB: {e}")
+    init_response_writer(db).put({
+        "user_name": user_name,
+        "question_id": question_id,
+        "response": response,
+        "timestamp": datetime.now()
+    })
 
 
 # -----------------------------
@@ -140,12 +224,12 @@ st.set_page_config(page_title="Identify the Demographic", layout="centered")
 # -----------------------------
 if "user_name" not in st.session_state:
     st.session_state.user_name = DEFAULT_USER_NAME
-if "questions" not in st.session_state or not st.session_state.questions:
-    st.session_state.questions = get_random_questions(st.session_state.user_name, 20)
 if "current_idx" not in st.session_state:
     st.session_state.current_idx = 0
 if "responses" not in st.session_state:
     st.session_state.responses = {}
+if "shuffled" not in st.session_state:
+    st.session_state.shuffled = {}  # Option order per question index, fixed once shown
 if "timer_start_time" not in st.session_state:
     st.session_state.timer_start_time = None
 if "assessment_started" not in st.session_state:
@@ -158,11 +242,17 @@ def start_new_session():
     st.session_state.user_name = DEFAULT_USER_NAME
     st.session_state.timer_start_time = None
     st.session_state.assessment_started = False
-    st.session_state.questions = get_random_questions(st.session_state.user_name, 20)
     st.session_state.current_idx = 0
     st.session_state.responses = {}
+    st.session_state.shuffled = {}
     st.rerun()
 
+def load_session_questions():
+    """Fetches the session's questions exactly once, even if none come back."""
+    if "questions_loaded" not in st.session_state:
+        st.session_state.questions = get_random_questions(st.session_state.user_name, 20)
+        st.session_state.questions_loaded = True
+
 def start_assessment_button_handler():
     """Sets the state to allow question display."""
     st.session_state.assessment_started = True
@@ -195,7 +285,21 @@ if not st.session_state.assessment_started:
     st.subheader("Task Instructions (Read Carefully!)")
     timer_placeholder = st.empty()
     if not timer_expired:
-        timer_placeholder.warning(f"⏰ Please take a moment to read the instructions. Assessment is enabled in: **{time_remaining} seconds**")
+        with timer_placeholder.container():
+            st.warning("⏰ Please take a moment to read the instructions. The assessment is enabled when the countdown reaches zero.")
+            # Count down in the browser so the server doesn't rerun every second
+            st.iframe(f"""
+                <div id="countdown" style="font-family: sans-serif;">Assessment is enabled in: <b>{time_remaining} seconds</b></div>
+                <script>
+                    let s = {time_remaining};
+                    const e = document.getElementById("countdown");
+                    const i = setInterval(() => {{
+                        s = Math.max(0, s - 1);
+                        e.innerHTML = "Assessment is enabled in: <b>" + s + " seconds</b>";
+                        if (s <= 0) clearInterval(i);
+                    }}, 1000);
+                </script>
+            """, height=30)
     else:
         timer_placeholder.success("✅ Instructions read time complete. You may now start the assessment.")
     st.markdown("""
@@ -217,31 +321,34 @@ if not st.session_state.assessment_started:
         on_click=start_assessment_button_handler
     )
     if not timer_expired:
-        time.sleep(1)
-        st.rerun()
+        # A single rerun once the timer runs out enables the button
+        st_autorefresh(interval=time_remaining * 1000, limit=1, key="instructions_timer")
+
+    # Fetch questions after the instructions have rendered, while the user reads them
+    load_session_questions()
 
 else:  # if st.session_state.assessment_started is True
     # ... (Assessment Running UI - No changes needed here) ...
+    load_session_questions()
     idx = st.session_state.current_idx
     questions = st.session_state.questions
     if not questions:
         st.warning("No questions are available in the database. Please check the 'questions_collection' in your MongoDB.")
     elif idx < len(questions):
         st.sidebar.markdown(f"**Current Session:** `{st.session_state.user_name}`")
-        qid, qtext, true_label, others_options_str = questions[idx]
-        try:
-            # This ast.literal_eval is now safe because we converted the list to a string in get_random_questions
-            other_options_list = ast.literal_eval(others_options_str)
-        except:
-            other_options_list = [] # Fallback
-            
-        if other_options_list and len(other_options_list) > 0:
-            false_label = random.choice(other_options_list)
-        else:
-            false_label = "Other Category"
-            
-        option_labels = [true_label, false_label, "Don't know/Neutral"]
-        random.shuffle(option_labels)
+        qid, qtext, true_label, other_options_list = questions[idx]
+
+        # Pick and shuffle the options once per question, so reruns keep the same layout
+        if idx not in st.session_state.shuffled:
+            if other_options_list and len(other_options_list) > 0:
+                false_label = random.choice(other_options_list)
+            else:
+                false_label = "Other Category"
+
+            option_labels = [true_label, false_label, NEUTRAL_LABEL]
+            random.shuffle(option_labels)
+            st.session_state.shuffled[idx] = tuple(option_labels)
+        option_a, option_b, option_c = st.session_state.shuffled[idx]
         
         st.markdown(f"## Question {idx+1} of {len(questions)}")
         st.progress((idx+1) / len(questions))
@@ -253,11 +360,11 @@ else:  # if st.session_state.assessment_started is True
             
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.button(option_labels[0], use_container_width=True, on_click=handle_answer_submission, args=(option_labels[0],), type="secondary")
+            st.button(option_a, use_container_width=True, on_click=handle_answer_submission, args=(option_a,), type="secondary")
         with col2:
-            st.button(option_labels[1], use_container_width=True, on_click=handle_answer_submission, args=(option_labels[1],), type="secondary")
+            st.button(option_b, use_container_width=True, on_click=handle_answer_submission, args=(option_b,), type="secondary")
         with col3:
-            st.button(option_labels[2], use_container_width=True, on_click=handle_answer_submission, args=(option_labels[2],), type="secondary")
+            st.button(option_c, use_container_width=True, on_click=handle_answer_submission, args=(option_c,), type="secondary")
             
     else:
         # --- Completion Screen ---
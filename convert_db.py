@@ -1,9 +1,14 @@
 import sqlite3
-import pandas as pd
+from openpyxl import Workbook
 import os
-from typing import Optional
+from typing import List, Optional
 
-def sqlite_to_excel(db_file: str, excel_file: str, table_name: Optional[str] = None):
+def quote_identifier(name: str) -> str:
+    """Quotes an SQLite identifier (table or column name) for use in a query."""
+    return '"' + name.replace('"', '""') + '"'
+
+def sqlite_to_excel(db_file: str, excel_file: str, table_name: Optional[str] = None,
+                    chunk_size: int = 10000, columns: Optional[List[str]] = None):
     """
     Connects to an SQLite database file, extracts data from a specified table,
     and converts it into an Excel (.xlsx) file.
@@ -13,6 +18,10 @@ def sqlite_to_excel(db_file: str, excel_file: str, table_name: Optional[str] = N
         excel_file (str): Path for the output Excel file (.xlsx).
         table_name (str, optional): The name of the table to extract. 
                                     If None, the script will prompt the user.
+        chunk_size (int, optional): Number of rows read and written at a time.
+                                    Peak memory grows with this, not the table size.
+        columns (list of str, optional): The columns to export. If None, every
+                                         non-BLOB column of the table is exported.
     """
     if not os.path.exists(db_file):
         print(f"Error: Database file not found at '{db_file}'")
@@ -24,16 +33,17 @@ def sqlite_to_excel(db_file: str, excel_file: str, table_name: Optional[str] = N
         conn = sqlite3.connect(db_file)
         print(f"Successfully connected to database: {db_file}")
 
-        # 2. If table name is not provided, list available tables
-        if table_name is None:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [row[0] for row in cursor.fetchall()]
-            
-            if not tables:
-                print("Error: No tables found in the database.")
-                return
+        # 2. List available tables; a table name is only accepted if it is one of them
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        tables = [row[0] for row in cursor.fetchall()]
+        
+        if not tables:
+            print("Error: No tables found in the database.")
+            return
 
+        # If table name is not provided, prompt for one
+        if table_name is None:
             print("\nAvailable tables:")
             for i, table in enumerate(tables):
                 print(f"  {i+1}. {table}")
@@ -48,25 +58,58 @@ def sqlite_to_excel(db_file: str, excel_file: str, table_name: Optional[str] = N
             else:
                 print(f"Error: Invalid selection or table name provided: '{selection}'")
                 return
+        elif table_name not in tables:
+            print(f"Error: Table '{table_name}' not found in the database.")
+            return
+
+        # 3. Work out which columns to read, so unused ones never leave SQLite
+        cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+        table_columns = {row[1]: row[2].upper() for row in cursor.fetchall()}
+        
+        if columns is None:
+            # BLOBs can't be written to Excel cells
+            columns = [name for name, col_type in table_columns.items() if col_type != 'BLOB']
+        else:
+            unknown = [name for name in columns if name not in table_columns]
+            if unknown:
+                print(f"Error: Column(s) not found in table '{table_name}': {', '.join(unknown)}")
+                return
 
-        # 3. Read data from the selected table into a pandas DataFrame
+        if not columns:
+            print(f"Error: Table '{table_name}' has no columns to export.")
+            return
+
+        # 4. Read data from the selected table, chunk_size rows at a time
         print(f"\nReading data from table: '{table_name}'...")
-        sql_query = f"SELECT * FROM {table_name}"
+        column_list = ", ".join(quote_identifier(name) for name in columns)
+        sql_query = f"SELECT {column_list} FROM {quote_identifier(table_name)}"
         
-        # pandas automatically handles the SQL connection and query execution
-        df = pd.read_sql_query(sql_query, conn)
+        cursor.execute(sql_query)
+        rows = cursor.fetchmany(chunk_size)
         
-        if df.empty:
+        if not rows:
              print(f"Warning: Table '{table_name}' is empty. No data to export.")
              return
 
-        print(f"Read {len(df)} rows and {len(df.columns)} columns.")
-
-        # 4. Write the DataFrame to an Excel file
+        # 5. Stream the rows into an Excel file
         print(f"Writing data to Excel file: {excel_file}...")
         
-        # openpyxl engine is used for .xlsx format, which is required
-        df.to_excel(excel_file, sheet_name=table_name, index=False, engine='openpyxl')
+        # openpyxl's write_only mode streams appended rows to disk instead of
+        # keeping a cell object per value in memory
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(table_name)
+        worksheet.append([col[0] for col in cursor.description])
+        
+        row_count = 0
+        while rows:
+            for row in rows:
+                worksheet.append(row)
+            row_count += len(rows)
+            rows = cursor.fetchmany(chunk_size)
+        
+        workbook.save(excel_file)
+
+        print(f"Wrote {row_count} rows and {len(columns)} columns.")
         
         print("\n✅ Conversion complete!")
         print(f"Data from table '{table_name}' has been saved to '{excel_file}'.")
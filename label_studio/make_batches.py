@@ -1,36 +1,43 @@
-import csv
-import json
-import random
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import orjson
+import pandas as pd
+
 INPUT_CSV = "questions.csv"
 OUT_DIR = Path("batches")
 QUESTIONS_PER_BATCH = 20
+# Accepted column names, in order of preference
+QUESTION_ID_COLUMNS = ["question_id", "id"]
+QUESTION_TEXT_COLUMNS = ["question_text", "text", "question"]
+
+
+def load_questions():
+    """Reads the questions CSV into a list of {"question_id", "question_text"} dicts."""
+    # Every column is read as text, so ids are emitted exactly as written
+    df = pd.read_csv(
+        INPUT_CSV,
+        usecols=lambda c: c in QUESTION_ID_COLUMNS + QUESTION_TEXT_COLUMNS,
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8",
+    )
+    id_col = next((c for c in QUESTION_ID_COLUMNS if c in df.columns), None)
+    text_col = next((c for c in QUESTION_TEXT_COLUMNS if c in df.columns), None)
+    if text_col is None:
+        raise ValueError("CSV must have a column named question_text (or text/question).")
+
+    questions = pd.DataFrame({
+        "question_id": df[id_col].replace("", None) if id_col else None,
+        "question_text": df[text_col],
+    })
+    return questions.sample(frac=1).to_dict("records")
 
-OUT_DIR.mkdir(exist_ok=True)
-
-# Read questions
-questions = []
-with open(INPUT_CSV, newline='', encoding='utf-8') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        qid = row.get("question_id") or row.get("id") or None
-        qtext = row.get("question_text") or row.get("text") or row.get("question") or None
-        if qtext is None:
-            raise ValueError("CSV must have a column named question_text (or text/question).")
-        questions.append({"question_id": qid, "question_text": qtext})
-
-if len(questions) < QUESTIONS_PER_BATCH:
-    raise SystemExit("Not enough questions to form one batch.")
-
-# Shuffle and split into batches
-random.shuffle(questions)
-batches = [questions[i:i+QUESTIONS_PER_BATCH] for i in range(0, len(questions), QUESTIONS_PER_BATCH)]
-
-# If last batch < QUESTIONS_PER_BATCH you can either
-# 1) discard it, 2) merge with previous, or 3) allow a smaller final batch.
-# Here we will keep it (Label Studio supports varying numbers).
-for i, batch in enumerate(batches, start=1):
+
+def write_batch(numbered_batch):
+    """Writes one batch as a Label Studio task file. Runs in a worker process."""
+    i, batch = numbered_batch
     tasks = []
     for q in batch:
         # Label Studio import format: a list of task objects with "data"
@@ -43,8 +50,41 @@ for i, batch in enumerate(batches, start=1):
             }
         })
     out_file = OUT_DIR / f"batch_{i}.json"
-    with open(out_file, "w", encoding="utf-8") as fo:
-        json.dump(tasks, fo, ensure_ascii=False, indent=2)
-    print(f"Wrote {out_file} ({len(tasks)} tasks)")
+    # orjson writes UTF-8 bytes directly (non-ASCII is kept as-is, like ensure_ascii=False)
+    with open(out_file, "wb") as fo:
+        fo.write(orjson.dumps(tasks, option=orjson.OPT_INDENT_2))
+    return out_file, len(tasks)
+
+
+def main():
+    OUT_DIR.mkdir(exist_ok=True)
+
+    # Read and shuffle questions
+    questions = load_questions()
+
+    if len(questions) < QUESTIONS_PER_BATCH:
+        raise SystemExit("Not enough questions to form one batch.")
+
+    # Split into batches
+    batches = [questions[i:i+QUESTIONS_PER_BATCH] for i in range(0, len(questions), QUESTIONS_PER_BATCH)]
+
+    # If last batch < QUESTIONS_PER_BATCH you can either
+    # 1) discard it, 2) merge with previous, or 3) allow a smaller final batch.
+    # Here we will keep it (Label Studio supports varying numbers).
+    # Batches are independent, so they are written in parallel; several go to
+    # each worker per round-trip to keep inter-process overhead down.
+    workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            write_batch,
+            enumerate(batches, start=1),
+            chunksize=max(1, len(batches) // (workers * 4)),
+        )
+        for out_file, task_count in results:
+            print(f"Wrote {out_file} ({task_count} tasks)")
+
+    print("Done. Import the JSON files in the batches/ folder to Label Studio.")
+
 
-print("Done. Import the JSON files in the batches/ folder to Label Studio.")
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import streamlit as st
 import sqlite3
+import csv
+import json
 import random
+import re
+import threading
 import os
-import pandas as pd 
 import ast 
-from datetime import datetime
+from datetime import datetime, timezone
 import time 
 
 # -----------------------------
@@ -14,128 +17,227 @@ DB_NAME = "responses.db"
 QUESTION_CSV_FILE = "Question_dataset.csv" 
 DEFAULT_USER_NAME = "Annotator_Guest" 
 TIMER_DURATION_SECONDS = 20 # Minimum timer duration
+RESPONSE_FLUSH_SIZE = 5 # Buffered responses are written every this many answers
 
 # -----------------------------
-# Database setup (UNCHANGED)
+# SQL statements
 # -----------------------------
+# Kept as module constants so every call passes the same string and hits the
+# connection's prepared-statement cache
+_COUNT_QUESTIONS_SQL = "SELECT COUNT(*) FROM questions"
+_INSERT_QUESTION_SQL = """
+    INSERT INTO questions (question_id, question_text, true_label, others_options) 
+    VALUES (?, ?, ?, ?)
+"""
+_SELECT_QUESTIONS_SQL = "SELECT question_id, question_text, true_label, others_options FROM questions"
+_COUNT_UNANSWERED_SQL = """
+    SELECT COUNT(*) FROM questions q
+    WHERE NOT EXISTS (
+        SELECT 1 FROM responses r WHERE r.question_id = q.question_id AND r.user_name = ?
+    )
+"""
+_INSERT_RESPONSE_SQL = """
+    INSERT INTO responses (user_name, question_id, response, timestamp) 
+    VALUES (?, ?, ?, ?)
+"""
+
+# -----------------------------
+# Database setup
+# -----------------------------
+
+@st.cache_resource
+def get_conn():
+    """Opens one SQLite connection that is shared across reruns and sessions."""
+    # isolation_level=None puts the connection in autocommit mode
+    conn = sqlite3.connect(DB_NAME, check_same_thread=False, isolation_level=None,
+                           cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@st.cache_resource
+def get_write_lock():
+    """Returns the lock that every write transaction on the shared connection must hold."""
+    # The connection is shared by all session threads, and it can only have one
+    # transaction open at a time
+    return threading.Lock()
 
 def init_db():
     """Initializes the SQLite database with necessary tables."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    # One transaction for the whole schema; `with` commits it, or rolls back on error
+    with get_write_lock(), get_conn() as conn:
+        conn.execute("BEGIN")
+        
+        # Table for questions 
+        conn.execute('''CREATE TABLE IF NOT EXISTS questions (
+                    question_id INTEGER PRIMARY KEY,
+                    question_text TEXT,
+                    true_label TEXT,
+                    others_options TEXT
+                )''')
     
-    # Table for questions 
-    c.execute('''CREATE TABLE IF NOT EXISTS questions (
-                question_id INTEGER PRIMARY KEY,
-                question_text TEXT,
-                true_label TEXT,
-                others_options TEXT
-            )''')
+        # Table for responses - allows any text label (Male, Female, Neutral, etc.)
+        conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_name TEXT,
+                    question_id INTEGER,
+                    response TEXT, 
+                    timestamp DATETIME
+                )''')
     
-    # Table for responses - allows any text label (Male, Female, Neutral, etc.)
-    c.execute('''CREATE TABLE IF NOT EXISTS responses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_name TEXT,
-                question_id INTEGER,
-                response TEXT, 
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )''')
-    conn.commit()
-    conn.close()
+        # Lets the per-user "unanswered" lookup probe an index instead of scanning responses
+        conn.execute('''CREATE INDEX IF NOT EXISTS idx_responses_user_qid
+                    ON responses (user_name, question_id)''')
+
+# One option label: a run between braces/commas, without surrounding whitespace
+_OPT_RE = re.compile(r'[^,{}\s][^,{}]*[^,{}\s]|[^,{}\s]')
+
+def clean_options(option_str):
+    """Turns the CSV's "{Female, LGBTQ}" option format into a list of labels."""
+    if isinstance(option_str, str):
+        return _OPT_RE.findall(option_str)
+    return []
 
 def load_questions_from_csv():
-    """Reads the structured questions from the CSV file and cleans others_options."""
+    """
+    Reads the structured questions from the CSV file and cleans others_options.
+    Returns a list of (question_id, question_text, true_label, others_options) tuples.
+    """
     try:
-        df = pd.read_csv(QUESTION_CSV_FILE)
-        df = df.rename(columns={'id': 'question_id', 'sentence': 'question_text'})
-        
-        def clean_options(option_str):
-            if isinstance(option_str, str):
-                clean_str = option_str.strip().strip('{}')
-                return [s.strip() for s in clean_str.split(',')]
-            return []
-            
-        df['others_options'] = df['others_options'].apply(clean_options)
-        
-        return df[['question_id', 'question_text', 'true_label', 'others_options']]
+        with open(QUESTION_CSV_FILE, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            return [
+                (int(row['id']), row['sentence'], row['true_label'], clean_options(row['others_options']))
+                for row in reader
+            ]
     except FileNotFoundError:
         st.error(f"Error: The file '{QUESTION_CSV_FILE}' was not found. Please ensure it is in the same directory.")
-        return pd.DataFrame() 
+        return []
 
 def insert_questions_if_empty():
     """Inserts data from the CSV into the questions table if it's empty."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM questions")
+    c.execute(_COUNT_QUESTIONS_SQL)
     count = c.fetchone()[0]
     
     if count == 0:
-        st.info(f"Initializing database from {QUESTION_CSV_FILE}...")
-        df_questions = load_questions_from_csv()
+        print(f"Initializing database from {QUESTION_CSV_FILE}...")
+        questions = load_questions_from_csv()
         
-        if not df_questions.empty:
-            df_questions['others_options_str'] = df_questions['others_options'].apply(str)
-            
-            data_to_insert = df_questions[['question_id', 'question_text', 'true_label', 'others_options_str']].values.tolist()
+        if questions:
+            data_to_insert = (
+                (qid, qtext, label, json.dumps(opts))
+                for qid, qtext, label, opts in questions
+            )
             
-            c.executemany("""
-                INSERT INTO questions (question_id, question_text, true_label, others_options) 
-                VALUES (?, ?, ?, ?)
-            """, data_to_insert)
+            # Seed in one transaction without fsyncs; a failed seed is simply redone on next start
+            with get_write_lock():
+                c.execute("PRAGMA synchronous=OFF")
+                try:
+                    with conn:
+                        conn.execute("BEGIN")
+                        conn.executemany(_INSERT_QUESTION_SQL, data_to_insert)
+                finally:
+                    c.execute("PRAGMA synchronous=NORMAL")
             
-            conn.commit()
-            st.success(f"Successfully loaded {len(df_questions)} questions into the database.")
+            print(f"Successfully loaded {len(questions)} questions into the database.")
         else:
             st.warning("Could not load data from CSV. The 'questions' table remains empty. Cannot start assessment.")
-            
-    conn.close()
+
+
+@st.cache_resource
+def _init_once():
+    """Creates the tables and seeds the questions once per process instead of on every rerun."""
+    # Streamlit replays st.* messages from cached functions on every call,
+    # which is why seeding progress goes to the server log
+    init_db()
+    insert_questions_if_empty()
+    return True
 
 
 # -----------------------------
 # Helper functions
 # -----------------------------
+@st.cache_data
+def load_question_pool():
+    """
+    Loads every question once per process, keyed by question_id, with
+    others_options already parsed into a tuple of labels.
+    """
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(_SELECT_QUESTIONS_SQL)
+    
+    pool = {}
+    for qid, qtext, true_label, others_options_str in c.fetchall():
+        try:
+            others_options = json.loads(others_options_str)
+        except ValueError:
+            # Rows seeded before options were stored as JSON hold a Python list repr
+            others_options = ast.literal_eval(others_options_str)
+        pool[qid] = (qid, qtext, true_label, tuple(others_options))
+    return pool
+
 def get_random_questions(user_name, n=20):
     """
     Fetches n random questions from the entire pool, ignoring past user responses, 
     to allow for multiple annotations per question.
     """
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Fetch all questions from the database
-    c.execute("SELECT question_id, question_text, true_label, others_options FROM questions")
-    all_questions = c.fetchall()
-    conn.close()
+    pool = load_question_pool()
     
-    if not all_questions:
-        # If the questions table is empty
-        return []
+    # Sampled from the cached pool itself, so every id drawn has a cached row
+    return random.sample(list(pool.values()), min(n, len(pool)))
 
-    # Return a random sample of n questions (or fewer if less than n are available)
-    if len(all_questions) < n:
-        return all_questions
-        
-    return random.sample(all_questions, n)
+def get_unanswered_count(user_name):
+    """Returns the number of questions the user has not responded to yet."""
+    conn = get_conn()
+    c = conn.cursor()
+    c.execute(_COUNT_UNANSWERED_SQL, (user_name,))
+    return c.fetchone()[0]
+
+def build_option_cache(questions):
+    """
+    Picks the false label and shuffles the three options for every question once,
+    returning {question index: (option, option, option)}.
+    """
+    option_cache = {}
+    for idx, (qid, qtext, true_label, other_options_list) in enumerate(questions):
+        if other_options_list and len(other_options_list) > 0:
+            false_label = random.choice(other_options_list)
+        else:
+            false_label = "Other Category" 
+
+        option_labels = [true_label, false_label, "Don't know/Neutral"]
+        random.shuffle(option_labels)
+        option_cache[idx] = tuple(option_labels)
+    return option_cache
 
 def save_response(user_name, question_id, response):
-    """Saves a single user response (the selected label) to the database."""
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO responses (user_name, question_id, response) 
-        VALUES (?, ?, ?)
-    """, (user_name, question_id, response))
-    conn.commit()
-    conn.close()
+    """Buffers a single user response (the selected label) until the next flush_responses()."""
+    # Timestamps are supplied here (UTC, "YYYY-MM-DD HH:MM:SS") so every column is bound
+    # by executemany; the table has no DEFAULT CURRENT_TIMESTAMP to fall back on
+    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    st.session_state.pending_responses.append((user_name, question_id, response, timestamp))
+
+def flush_responses():
+    """Writes all buffered responses to the database in a single transaction."""
+    pending = st.session_state.get("pending_responses")
+    if not pending:
+        return
+
+    with get_write_lock(), get_conn() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(_INSERT_RESPONSE_SQL, pending)
+    st.session_state.pending_responses = []
 
 # -----------------------------
 # Streamlit UI
 # -----------------------------
 st.set_page_config(page_title="Identify the Demographic", layout="centered")
 
-# Initialize DB and data
-init_db()
-insert_questions_if_empty()
+# Initialize DB and data (once per process)
+_init_once()
 
 # -----------------------------
 # Session state setup
@@ -144,10 +246,13 @@ if "user_name" not in st.session_state:
     st.session_state.user_name = DEFAULT_USER_NAME
 if "questions" not in st.session_state or not st.session_state.questions:
     st.session_state.questions = get_random_questions(st.session_state.user_name, 20)
+    st.session_state.option_cache = build_option_cache(st.session_state.questions)
 if "current_idx" not in st.session_state:
     st.session_state.current_idx = 0
 if "responses" not in st.session_state:
     st.session_state.responses = {}
+if "pending_responses" not in st.session_state:
+    st.session_state.pending_responses = []
 if "instructions_shown" not in st.session_state:
     st.session_state.instructions_shown = False
 # Timer state variables
@@ -161,19 +266,39 @@ def start_new_session():
     """Clears session state and resets for a new session."""
     # This function is now only used as a clean way to exit/restart the app
     # after the assessment is fully complete.
+    flush_responses()
     st.session_state.clear()
     st.session_state.user_name = DEFAULT_USER_NAME
     st.session_state.timer_start_time = None
     st.session_state.assessment_started = False 
     st.session_state.questions = get_random_questions(st.session_state.user_name, 20)
+    st.session_state.option_cache = build_option_cache(st.session_state.questions)
     st.session_state.current_idx = 0
     st.session_state.responses = {}
+    st.session_state.pending_responses = []
     st.rerun() 
 
 def start_assessment_button_handler():
     """Sets the state to allow question display."""
     st.session_state.assessment_started = True
 
+def get_time_remaining():
+    """Returns the whole seconds left before the assessment can be started."""
+    elapsed_time = time.time() - st.session_state.timer_start_time
+    return max(0, TIMER_DURATION_SECONDS - int(elapsed_time))
+
+# Only the countdown is a ticking fragment, so the rest of the instructions page is rendered
+# once instead of every second. It is shown only while time remains.
+@st.fragment(run_every="1s")
+def instructions_timer():
+    """Displays the countdown, then reruns the whole page once it has expired."""
+    time_remaining = get_time_remaining()
+    if time_remaining > 0:
+        st.warning(f"⏰ Please take a moment to read the instructions. Assessment is enabled in: **{time_remaining} seconds**")
+    else:
+        # One full run re-enables the Start button and replaces the timer with the ready message
+        st.rerun()
+
 
 # --- Core logic to handle the button click and advance question ---
 def handle_answer_submission(response_value):
@@ -183,6 +308,62 @@ def handle_answer_submission(response_value):
         save_response(st.session_state.user_name, qid, response_value)
         st.session_state.responses[qid] = response_value
         st.session_state.current_idx += 1
+        if len(st.session_state.pending_responses) >= RESPONSE_FLUSH_SIZE:
+            flush_responses()
+
+
+@st.fragment
+def question_card():
+    """Displays the current question with its answer buttons, rerunning on its own per answer."""
+    idx = st.session_state.current_idx
+    questions = st.session_state.questions
+    if idx >= len(questions):
+        # The last answer was just given; rerun the whole app for the completion screen
+        st.rerun()
+
+    qid, qtext, true_label, other_options_list = questions[idx]
+
+    # Options were picked and shuffled once when the questions were loaded
+    option_labels = st.session_state.option_cache[idx]
+
+    st.markdown(f"## Question {idx+1} of {len(questions)}")
+    st.progress((idx+1)/len(questions))
+
+    # Display question card
+    with st.container(border=True):
+        st.subheader(qtext)
+        st.markdown("---")
+        st.markdown('<p style="font-size: 16px;"><b>Select the demographic label for Person A:</b></p>', unsafe_allow_html=True) 
+
+    # --- Response Buttons ---
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.button(
+            option_labels[0], 
+            use_container_width=True, 
+            on_click=handle_answer_submission, 
+            args=(option_labels[0],),
+            type="secondary"
+        )
+
+    with col2:
+        st.button(
+            option_labels[1], 
+            use_container_width=True, 
+            on_click=handle_answer_submission, 
+            args=(option_labels[1],),
+            type="secondary"
+        )
+
+    with col3:
+        st.button(
+            option_labels[2], 
+            use_container_width=True, 
+            on_click=handle_answer_submission, 
+            args=(option_labels[2],),
+            type="secondary"
+        )
 # -------------------------------------------------------------------
 
 
@@ -203,22 +384,15 @@ if not st.session_state.assessment_started:
     # 1. Set the timer start time on first load
     if st.session_state.timer_start_time is None:
         st.session_state.timer_start_time = time.time()
-        
-    # 2. Calculate elapsed time
-    elapsed_time = time.time() - st.session_state.timer_start_time
-    time_remaining = max(0, TIMER_DURATION_SECONDS - int(elapsed_time))
-    timer_expired = time_remaining == 0
     
-    # 3. Display instructions
+    # 2. Display instructions
     st.subheader("Task Instructions (Read Carefully!)")
     
-    # Placeholder for the timer/status display
-    timer_placeholder = st.empty() 
-    
-    if not timer_expired:
-        timer_placeholder.warning(f"⏰ Please take a moment to read the instructions. Assessment is enabled in: **{time_remaining} seconds**")
+    # 3. Timer/status display; the countdown fragment stops ticking once it expires
+    if get_time_remaining() > 0:
+        instructions_timer()
     else:
-        timer_placeholder.success("✅ Instructions read time complete. You may now start the assessment.")
+        st.success("✅ Instructions read time complete. You may now start the assessment.")
 
     st.markdown("""
     All the statements are regarding **Person A**. Your task is to assign a demographic to Person A based on the statement. 
@@ -238,19 +412,14 @@ if not st.session_state.assessment_started:
     """)
     st.markdown("---")
     
-    # 4. START BUTTON LOGIC
+    # 4. START BUTTON LOGIC, enabled by the full run the timer triggers when it expires
     st.button(
         "Start Assessment", 
         type="primary", 
-        disabled=not timer_expired, 
+        disabled=get_time_remaining() > 0, 
         on_click=start_assessment_button_handler
     )
 
-    # 5. Force a rerun to update the timer every second if not expired
-    if not timer_expired:
-        time.sleep(1)
-        st.rerun()
-
 # -----------------------------
 # Assessment Running (Only runs if assessment_started is True)
 # -----------------------------
@@ -265,73 +434,20 @@ else: # if st.session_state.assessment_started is True
     elif idx < len(questions):
         st.sidebar.markdown(f"**Current Session:** `{st.session_state.user_name}`")
         
-        qid, qtext, true_label, others_options_str = questions[idx]
-
-        # --- DYNAMIC OPTION GENERATION ---
-        try:
-            other_options_list = ast.literal_eval(others_options_str)
-        except:
-            other_options_list = [s.strip() for s in others_options_str.strip('[]{}').split(',')]
-
-        if other_options_list and len(other_options_list) > 0:
-            false_label = random.choice(other_options_list)
-        else:
-            false_label = "Other Category" 
-
-        option_labels = [true_label, false_label, "Don't know/Neutral"]
-        random.shuffle(option_labels)
-        
-        # ---------------------------------
-        
-        st.markdown(f"## Question {idx+1} of {len(questions)}")
-        st.progress((idx+1)/len(questions))
-        
-        # Display question card
-        with st.container(border=True):
-            st.subheader(qtext)
-            st.markdown("---")
-            st.markdown('<p style="font-size: 16px;"><b>Select the demographic label for Person A:</b></p>', unsafe_allow_html=True) 
-
-        # --- Response Buttons ---
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            st.button(
-                option_labels[0], 
-                use_container_width=True, 
-                on_click=handle_answer_submission, 
-                args=(option_labels[0],),
-                type="secondary"
-            )
-
-        with col2:
-            st.button(
-                option_labels[1], 
-                use_container_width=True, 
-                on_click=handle_answer_submission, 
-                args=(option_labels[1],),
-                type="secondary"
-            )
-
-        with col3:
-            st.button(
-                option_labels[2], 
-                use_container_width=True, 
-                on_click=handle_answer_submission, 
-                args=(option_labels[2],),
-                type="secondary"
-            )
+        # Only the card reruns when an answer is clicked
+        question_card()
 
 
     else:
         # --- Completion Screen ---
+        flush_responses()
         st.balloons()
         st.success("🎉 Assessment Complete!")
         
         st.markdown("Your responses are **invaluable** to us and to the community. **Cheers to you for helping us build Responsible and Safe AI systems!** 🤝")
         st.markdown("---")
         
-        unanswered_count = len(get_random_questions(st.session_state.user_name, 10000))
+        unanswered_count = get_unanswered_count(st.session_state.user_name)
         
         # --- REMOVED THE "START NEXT ROUND" LOGIC ---
         if unanswered_count > 0: